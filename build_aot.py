@@ -0,0 +1,43 @@
+"""
+Build the optional ahead-of-time compiled greedy kernel used by main.py:
+
+  python build_aot.py
+
+This writes ore_aot*.so next to main.py. Unlike the numba JIT path it needs no
+compilation at startup, and numba is not required to import it.
+"""
+
+import os
+
+import numpy as np
+from numba.pycc import CC
+
+from main import _numba_kernels
+
+_greedy_kernel = _numba_kernels()[0]
+
+cc = CC("ore_aot")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+@cc.export("greedy", "f8[:](f8[:], f8, f8, f8, f8)")
+def greedy(T_other_gross, T_sum, budget, unit, protocol_fee):
+    """Float64 greedy search, as greedy_optimize(precision="f64"); T_sum = T_other_gross.sum()."""
+    s = np.zeros(T_other_gross.shape[0])
+    remaining_units = int(round(budget / unit))
+    if remaining_units <= 0:
+        return s
+    return _greedy_kernel(T_other_gross, T_sum, s, remaining_units, remaining_units,
+                          unit, protocol_fee, np.empty(s.shape[0]))
+
+@cc.export("greedy_f32", "f8[:](f8[:], f8, f8, f8, f8)")
+def greedy_f32(T_other_gross, T_sum, budget, unit, protocol_fee):
+    """As greedy, with the candidate marginals in float32 (greedy_optimize(precision="f32"))."""
+    s = np.zeros(T_other_gross.shape[0])
+    remaining_units = int(round(budget / unit))
+    if remaining_units <= 0:
+        return s
+    return _greedy_kernel(T_other_gross, T_sum, s, remaining_units, remaining_units,
+                          unit, protocol_fee, np.empty(s.shape[0], dtype=np.float32))
+
+if __name__ == "__main__":
+    cc.compile()
@@ -6,7 +6,12 @@ Find a (near-)optimal per-block allocation of a budget of SOL to maximize expect
 value after fees for the ORE mining game.
 
 Algorithm:
-  Greedy discrete marginal-EV allocation:
+  KKT / water-filling allocation (default):
+    - For a fixed total spend X the EV only depends on sum_i s_i/(T_i+s_i), which is
+      maximized by s_i = max(0, sqrt(T_i/mu) - T_i); mu has a closed form over the
+      funded blocks (sorted prefix sums).
+    - The spend X itself is found by bisection on the sign of dEV/dX in [0, budget].
+  Greedy discrete marginal-EV allocation (--legacy-greedy):
     - Discretize budget into units (default 0.001 SOL).
     - Repeatedly compute marginal EV (per unit) for adding one unit to each block,
       pick the block with the highest positive marginal EV, allocate one unit there,
@@ -31,28 +36,45 @@ Usage examples:
 """
 
 import argparse
-import numpy as np
 import csv
+import numpy as np
 import sys
+from functools import lru_cache
+from importlib.util import find_spec
 from textwrap import dedent
 
+# numba is optional (greedy_optimize falls back to NumPy) and only imported by
+# _numba_kernels() when a greedy run needs it: the import alone costs more than a KKT solve
+_has_numba = find_spec("numba") is not None
+prange = range  # numba.prange once numba is loaded
+
+try:
+    from ore_kernel import greedy_optimize_c
+except ImportError:  # compiled kernel is optional; build with `python setup.py build_ext --inplace`
+    greedy_optimize_c = None
+
+try:
+    from ore_aot import greedy as greedy_aot, greedy_f32 as greedy_aot_f32
+except ImportError:  # AOT-compiled numba kernel is optional; build with `python build_aot.py`
+    greedy_aot = greedy_aot_f32 = None
+
+def _parse_numbers(fields):
+    """Convert text fields to a float64 array, skipping blank ones (trailing commas, ragged rows)."""
+    return np.array([f for f in fields if f.strip() != ''], dtype=np.float64)
+
 def parse_grid_string(s):
-    parts = [p.strip() for p in s.split(',') if p.strip() != '']
-    if len(parts) != 25:
+    arr = _parse_numbers(s.replace('\n', ',').split(','))
+    if arr.size != 25:
         raise ValueError("Must supply exactly 25 numbers for the grid.")
-    return np.array([float(x) for x in parts], dtype=np.float64)
+    return arr
 
 def read_grid_csv(path):
-    vals = []
+    # csv.reader handles quoted cells from spreadsheet exports
     with open(path, newline='') as f:
-        r = csv.reader(f)
-        for row in r:
-            for cell in row:
-                if cell.strip() != '':
-                    vals.append(float(cell))
-    if len(vals) != 25:
-        raise ValueError("CSV must contain exactly 25 numbers (5x5). Found: %d" % len(vals))
-    return np.array(vals, dtype=np.float64)
+        arr = _parse_numbers([cell for row in csv.reader(f) for cell in row])
+    if arr.size != 25:
+        raise ValueError("CSV must contain exactly 25 numbers (5x5). Found: %d" % arr.size)
+    return arr
 
 # ---- Core math functions ----
 def compute_expected_return_and_components(T_net, s_net):
@@ -67,24 +89,17 @@ def compute_expected_return_and_components(T_net, s_net):
     n = len(T_net)
     total_net = T_net + s_net
     total_net_sum = total_net.sum()
-    expected_return = 0.0
-    ore_expected_raw = 0.0
 
-    for i in range(n):
-        denom = total_net[i]
-        if denom <= 0:
-            continue
-        sum_others = total_net_sum - denom
-        # payout if block i wins (before reward fee)
-        reward = (s_net[i] / denom) * sum_others
-        payout_i = s_net[i] + reward
-        expected_return += payout_i
-
-        # expected "chance" you get the single-miner ORE award when this block wins:
-        ore_expected_raw += (s_net[i] / denom)
+    # blocks with an empty pool contribute nothing
+    pos = total_net > 0
+    share = np.where(pos, s_net / np.where(pos, total_net, 1.0), 0.0)
+    # payout if block i wins (before reward fee): kept stake + share of everyone else's stake
+    reward = share * (total_net_sum - total_net)
+    payout = np.where(pos, s_net + reward, 0.0)
 
-    expected_return /= n
-    ore_expected_raw /= n  # because each block wins with probability 1/n
+    expected_return = payout.sum() / n
+    # expected "chance" you get the single-miner ORE award; each block wins with probability 1/n
+    ore_expected_raw = share.sum() / n
 
     expected_kept_stakes = s_net.sum() / n
     expected_rewards_before_fee = expected_return - expected_kept_stakes
@@ -103,8 +118,9 @@ def compute_ev(T_other_gross, s_alloc_gross, protocol_fee):
       - s_alloc_gross: your gross deployed per block (length 25)
     Returns dictionary with SOL EV after protocol fees.
     """
-    T_other_gross = np.array(T_other_gross, dtype=np.float64)
-    s_alloc_gross = np.array(s_alloc_gross, dtype=np.float64)
+    T_other_gross = np.asarray(T_other_gross, dtype=np.float64)
+    s_alloc_gross = np.asarray(s_alloc_gross, dtype=np.float64)
+
     # no admin fee - amounts sit in pool as deployed
     T_net = T_other_gross
     s_net = s_alloc_gross
@@ -131,10 +147,197 @@ def compute_ev(T_other_gross, s_alloc_gross, protocol_fee):
         'components': comps
     }
 
+def _ev_sol(T_other_gross, s_alloc_gross, protocol_fee):
+    """
+    Scalar SOL EV after fees (compute_ev's 'ev_sol_after_fees') without building the
+    result dicts. Inputs must be float64 ndarrays.
+    """
+    n = len(T_other_gross)
+    total = T_other_gross + s_alloc_gross
+    total_sum = total.sum()
+    pos = total > 0
+    share = np.where(pos, s_alloc_gross / np.where(pos, total, 1.0), 0.0)
+    payout = np.where(pos, s_alloc_gross + share * (total_sum - total), 0.0)
+    cost_gross = s_alloc_gross.sum()
+    expected_kept_stakes = cost_gross / n
+    expected_rewards_after_fee = (payout.sum() / n - expected_kept_stakes) * (1.0 - protocol_fee)
+    return float(expected_kept_stakes + expected_rewards_after_fee - cost_gross)
+
+def _ev_batch(T_other_gross, S_cand, protocol_fee):
+    """
+    SOL EV after fees for several candidate allocations at once.
+    S_cand has one allocation per row (shape (k, 25)); all rows are evaluated in a
+    single broadcast against T_other_gross. Returns a length-k vector.
+    """
+    n = T_other_gross.shape[0]
+    total = T_other_gross[None, :] + S_cand
+    total_sum = total.sum(axis=1, keepdims=True)
+    pos = total > 0
+    share = np.where(pos, S_cand / np.where(pos, total, 1.0), 0.0)
+    payout = np.where(pos, S_cand + share * (total_sum - total), 0.0)
+    expected_return = payout.sum(axis=1) / n
+    cost_gross = S_cand.sum(axis=1)
+    expected_kept_stakes = cost_gross / n
+    expected_rewards_after_fee = (expected_return - expected_kept_stakes) * (1.0 - protocol_fee)
+    return expected_kept_stakes + expected_rewards_after_fee - cost_gross
+
+def _pool_state(T, s, T_sum=None):
+    """
+    Build the running pool state used by the greedy allocator:
+      total = T + s, its sum, your share s/total per block and the reward you
+      collect if each block wins (share * sum_others).
+    Pass T_sum = T.sum() when it is already known.
+    """
+    total = T + s
+    if T_sum is None:
+        T_sum = T.sum()
+    total_sum = T_sum + s.sum()
+    pos = total > 0
+    share = np.where(pos, s / np.where(pos, total, 1.0), 0.0)
+    reward = share * (total_sum - total)
+    return total, total_sum, share, reward
+
+# scratch buffers for the per-step greedy math (NumPy path), one set per dtype;
+# reused to avoid temporaries
+_N = 25
+_scratch_buffers = {}
+
+def _scratch(dtype):
+    """Return the (sum_others, bumped, tmp, delta) scratch buffers for dtype."""
+    dtype = np.dtype(dtype)
+    bufs = _scratch_buffers.get(dtype)
+    if bufs is None:
+        bufs = _scratch_buffers[dtype] = tuple(np.empty(_N, dtype=dtype) for _ in range(4))
+    return bufs
+
+def _marginal_ev(s, total, total_sum, share, share_sum, reward, unit, protocol_fee, dtype=np.float64):
+    """
+    Closed-form marginal SOL EV for adding `unit` to each block, given the pool state.
+    Adding to block i only changes block i's own reward term; every other block j
+    just sees its sum_others grow by `unit`, i.e. +unit * share_j.
+    Computed in place in the module scratch buffers for dtype (float32 or float64);
+    the returned array is the shared delta buffer.
+    """
+    n = len(total)
+    _buf_sum_others, _buf_bumped, _buf_tmp, _buf_delta = _scratch(dtype)
+    # block i after the bump: sum_others is unchanged (total_i and total_sum both grow by unit)
+    np.subtract(total_sum, total, out=_buf_sum_others)
+    np.add(s, unit, out=_buf_bumped)
+    np.add(total, unit, out=_buf_tmp)
+    np.divide(_buf_bumped, _buf_tmp, out=_buf_bumped)
+    np.multiply(_buf_bumped, _buf_sum_others, out=_buf_bumped)
+    np.subtract(_buf_bumped, reward, out=_buf_bumped)
+    # every other block gains unit * share_j
+    np.subtract(share_sum, share, out=_buf_tmp)
+    np.multiply(unit, _buf_tmp, out=_buf_tmp)
+    np.add(_buf_tmp, _buf_bumped, out=_buf_delta)
+    # kept stakes grow by unit/n, cost grows by unit, rewards are charged the protocol fee
+    np.multiply(1.0 - protocol_fee, _buf_delta, out=_buf_delta)
+    np.divide(_buf_delta, n, out=_buf_delta)
+    np.add(unit / n - unit, _buf_delta, out=_buf_delta)
+    return _buf_delta
+
 # ---- Greedy discrete optimizer ----
-def greedy_optimize(T_other_gross, budget, unit, protocol_fee, max_iters=None):
+def _greedy_kernel(T, T_sum, s0, remaining_units, max_iters, unit, protocol_fee, deltas):
+    """
+    Scalar-loop version of the greedy allocator, compiled with numba when available.
+    Starts from the float64 allocation s0 (not modified) and returns the extended one.
+    T_sum = T.sum() is constant for the whole run.
+    Same closed-form marginal EV as _marginal_ev, written with explicit index loops;
+    the pool state is updated incrementally after each accepted unit.
+    The pool state is always float64 so rounding does not build up over the steps;
+    only the per-candidate marginals run in the dtype of the `deltas` scratch array
+    (float32 or float64).
+    The grid size is the module constant _N so numba can specialize the block loops.
+    """
+    n = _N
+    ft = deltas.dtype.type
+    nf = ft(n)
+    one = ft(1)
+    unit_f = ft(unit)
+    fee_f = ft(protocol_fee)
+    s = s0.copy()
+    total = np.empty(n)
+    share = np.zeros(n)
+    reward = np.empty(n)
+    s_sum = 0.0
+    share_sum = 0.0
+    for i in range(n):
+        total[i] = T[i] + s[i]
+        s_sum += s[i]
+    total_sum = T_sum + s_sum
+    for i in range(n):
+        if total[i] > 0:
+            share[i] = s[i] / total[i]
+        share_sum += share[i]
+    for i in range(n):
+        reward[i] = share[i] * (total_sum - total[i])
+
+    for step in range(max_iters):
+        if remaining_units <= 0:
+            break
+
+        # candidates are independent: prange splits them across threads in the
+        # parallel build and is a plain range otherwise. The bound is spelled _N:
+        # numba's parfor pass mis-lowers prange over the local alias n.
+        for j in prange(_N):
+            sum_others = ft(total_sum - total[j])
+            reward_bumped = (ft(s[j]) + unit_f) / (ft(total[j]) + unit_f) * sum_others
+            delta_rewards = unit_f * ft(share_sum - share[j]) + (reward_bumped - ft(reward[j]))
+            deltas[j] = unit_f / nf - unit_f + (one - fee_f) * delta_rewards / nf
+
+        best_idx = -1
+        best_delta = -1e18
+        for i in range(n):
+            if deltas[i] > best_delta:
+                best_delta = deltas[i]
+                best_idx = i
+
+        if best_delta <= 1e-12:
+            break
+
+        s[best_idx] += unit
+        total[best_idx] += unit
+        s_sum += unit
+        total_sum = T_sum + s_sum
+        remaining_units -= 1
+
+        # every other block's sum_others grew by unit; only best_idx's share moved
+        for i in range(n):
+            reward[i] += unit * share[i]
+        share_sum -= share[best_idx]
+        share[best_idx] = s[best_idx] / total[best_idx]
+        share_sum += share[best_idx]
+        reward[best_idx] = share[best_idx] * (total_sum - total[best_idx])
+
+    return s
+
+_numba_builds = None
+
+def _numba_kernels():
+    """
+    (serial, parallel) numba builds of _greedy_kernel, importing numba on first use.
+    Returns None when numba is not installed.
+    """
+    global _numba_builds, prange
+    if not _has_numba:
+        return None
+    if _numba_builds is None:
+        import numba
+        prange = numba.prange
+        # the parallel build is not cached: both builds share one source function
+        # and would collide in numba's cache
+        _numba_builds = (numba.njit(cache=True, fastmath=True)(_greedy_kernel),
+                         numba.njit(fastmath=True, parallel=True)(_greedy_kernel))
+    return _numba_builds
+
+def greedy_optimize(T_other_gross, budget, unit, protocol_fee, max_iters=None, precision="f64",
+                    parallel=False):
     """
     Greedy allocate discrete units to maximize SOL EV.
+    precision="f32" evaluates the per-step candidate marginals in float32 (twice the
+    SIMD lanes); the running pool state and the returned allocation stay float64.
+    parallel=True evaluates the 25 candidates per step on numba's thread pool.
     Returns s_alloc_gross vector.
     """
     n = len(T_other_gross)
@@ -147,30 +350,48 @@ def greedy_optimize(T_other_gross, budget, unit, protocol_fee, max_iters=None):
     if max_iters is None:
         max_iters = remaining_units
 
-    # Precompute T_other_gross constant
+    # Precompute T_other_gross and its sum once; both are constant for the whole run
     T_other_gross = np.array(T_other_gross, dtype=np.float64)
+    T_sum = T_other_gross.sum()
+    # the AOT kernel has no warmup, but only covers the full serial run
+    use_aot = max_iters == remaining_units and not (parallel and _has_numba)
+    if precision == "f32":
+        if use_aot and greedy_aot_f32 is not None:
+            return greedy_aot_f32(T_other_gross, T_sum, budget, unit, protocol_fee)
+        return _greedy_search(T_other_gross, T_sum, s, remaining_units, max_iters, unit, protocol_fee,
+                              parallel, np.float32)
+    if greedy_optimize_c is not None and not (parallel and _has_numba):
+        return greedy_optimize_c(T_other_gross, budget, unit, protocol_fee, max_iters)
+    if use_aot and greedy_aot is not None:
+        return greedy_aot(T_other_gross, T_sum, budget, unit, protocol_fee)
+    return _greedy_search(T_other_gross, T_sum, s, remaining_units, max_iters, unit, protocol_fee, parallel)
+
+def _greedy_search(T, T_sum, s0, remaining_units, max_iters, unit, protocol_fee, parallel=False,
+                   dtype=np.float64):
+    """
+    Greedy loop starting from allocation s0 (not modified), with the candidate
+    marginals evaluated in dtype: the numba kernel when available (the prange build
+    if parallel), NumPy otherwise.
+    """
+    kernels = _numba_kernels()
+    if kernels is not None:
+        kernel = kernels[1] if parallel else kernels[0]
+        return kernel(T, T_sum, s0, remaining_units, max_iters, unit, protocol_fee, np.empty(_N, dtype=dtype))
+
+    s = s0.copy()
+    total, total_sum, share, reward = _pool_state(T, s, T_sum)
+    s_sum = total_sum - T_sum
+    _buf_tmp = _scratch(T.dtype)[2]
+    share_sum = share.sum()
 
     for step in range(max_iters):
         if remaining_units <= 0:
             break
 
-        # compute base EV
-        base = compute_ev(T_other_gross, s, protocol_fee)
-        base_score = base['ev_sol_after_fees']
-
-        best_idx = None
-        best_delta = -1e18
-
-        # evaluate adding one unit to each block
-        for i in range(n):
-            s_test = s.copy()
-            s_test[i] += unit
-            candidate = compute_ev(T_other_gross, s_test, protocol_fee)
-            candidate_score = candidate['ev_sol_after_fees']
-            delta = candidate_score - base_score
-            if delta > best_delta:
-                best_delta = delta
-                best_idx = i
+        # marginal EV of adding one unit to each block
+        deltas = _marginal_ev(s, total, total_sum, share, share_sum, reward, unit, protocol_fee, dtype)
+        best_idx = int(np.argmax(deltas))
+        best_delta = deltas[best_idx]
 
         # stop if no positive marginal EV
         if best_delta <= 1e-12:
@@ -179,10 +400,204 @@ def greedy_optimize(T_other_gross, budget, unit, protocol_fee, max_iters=None):
 
         # allocate one unit to best_idx
         s[best_idx] += unit
+        total[best_idx] += unit
+        s_sum += unit
+        total_sum = T_sum + s_sum
         remaining_units -= 1
 
+        # incremental state update: every other block's sum_others grew by unit,
+        # only best_idx's share changed
+        np.multiply(unit, share, out=_buf_tmp)
+        np.add(reward, _buf_tmp, out=reward)
+        share_sum -= share[best_idx]
+        share[best_idx] = s[best_idx] / total[best_idx]
+        share_sum += share[best_idx]
+        reward[best_idx] = share[best_idx] * (total_sum - total[best_idx])
+
     return s
 
+def greedy_multiscale(T_other_gross, budget, final_unit, protocol_fee, scales=(50, 10, 1), precision="f64"):
+    """
+    Coarse-to-fine greedy: place chunks of final_unit*k for each k in scales, carrying
+    the allocation over, and finish with the plain greedy at final_unit.
+    A coarse chunk goes to the block the fine greedy would pick next, and only if the
+    chunk's last unit still has positive marginal EV, so no block is pushed past its
+    fine-grained optimum (greedy stakes can never be taken back). Each coarse stage
+    also leaves one chunk per block of budget to the finer stages to even out the
+    marginals when the budget binds.
+    The coarse stages run in Python, so this only pays off on the NumPy fallback:
+    when a compiled greedy kernel is available the plain greedy_optimize is used.
+    Returns s_alloc_gross vector (whole multiples of final_unit).
+    """
+    T_other_gross = np.array(T_other_gross, dtype=np.float64)
+    n = len(T_other_gross)
+    assert n == 25
+    if precision == "f32":
+        compiled = _has_numba or greedy_aot_f32 is not None
+    else:
+        compiled = _has_numba or greedy_aot is not None or greedy_optimize_c is not None
+    if compiled:
+        return greedy_optimize(T_other_gross, budget, final_unit, protocol_fee, precision=precision)
+    T_sum = T_other_gross.sum()
+    s = np.zeros(n, dtype=np.float64)
+    remaining_units = int(round(budget / final_unit))
+
+    for k in scales:
+        if k <= 1:
+            break
+        while remaining_units >= k * n:
+            total, total_sum, share, reward = _pool_state(T_other_gross, s, T_sum)
+            share_sum = share.sum()
+            deltas = _marginal_ev(s, total, total_sum, share, share_sum, reward, final_unit, protocol_fee)
+            best_idx = int(np.argmax(deltas))
+            if deltas[best_idx] <= 1e-12:
+                break
+            # fine marginal of the chunk's last unit, i.e. with k-1 of its units placed
+            saved = s[best_idx]
+            s[best_idx] = saved + (k - 1) * final_unit
+            total, total_sum, share, reward = _pool_state(T_other_gross, s, T_sum)
+            last = _marginal_ev(s, total, total_sum, share, share.sum(), reward, final_unit,
+                                protocol_fee)[best_idx]
+            if last <= 1e-12:
+                s[best_idx] = saved
+                break
+            s[best_idx] = saved + k * final_unit
+            remaining_units -= k
+
+    if remaining_units > 0:
+        dtype = np.float32 if precision == "f32" else np.float64
+        s = _greedy_search(T_other_gross, T_sum, s, remaining_units, remaining_units, final_unit,
+                           protocol_fee, dtype=dtype)
+    return np.round(s / final_unit) * final_unit
+
+# ---- Marginal EV report ----
+def marginal_report(T_other_gross, s_alloc_gross, unit, protocol_fee):
+    """
+    Marginal SOL EV for adding one unit to each block, by differencing _ev_sol.
+    Memoized per (T, s, unit, fee), so repeating a report in one process is free.
+    Returns a length-25 vector.
+    """
+    T = np.ascontiguousarray(T_other_gross, dtype=np.float64)
+    s = np.ascontiguousarray(s_alloc_gross, dtype=np.float64)
+    return np.array(_marginal_report_cached(T.tobytes(), s.tobytes(), unit, protocol_fee))
+
+@lru_cache(maxsize=256)
+def _marginal_report_cached(T_bytes, s_bytes, unit, protocol_fee):
+    """marginal_report keyed on the raw float64 bytes of T and s; returns a tuple."""
+    T = np.frombuffer(T_bytes, dtype=np.float64)
+    # one writable copy of s for the in-place probes
+    s = np.frombuffer(s_bytes, dtype=np.float64).copy()
+    return tuple(_probe_marginals(T, s, unit, protocol_fee))
+
+def _probe_marginals(T, s, unit, protocol_fee):
+    """
+    Marginal SOL EV of one more unit on each block, bumping s in place one block at
+    a time. Each probed value is restored exactly, even if _ev_sol raises, so s is
+    bit-identical on return.
+    """
+    base_score_sol = _ev_sol(T, s, protocol_fee)
+    deltas = np.empty(len(s))
+    for i in range(len(s)):
+        saved = s[i]
+        s[i] = saved + unit
+        try:
+            deltas[i] = _ev_sol(T, s, protocol_fee) - base_score_sol
+        finally:
+            s[i] = saved
+    return deltas
+
+# ---- KKT / water-filling optimizer ----
+def _waterfill(T, spend):
+    """
+    Split `spend` across blocks to maximize sum_i s_i/(T_i+s_i).
+    Each term is concave, so at the optimum every funded block has the same
+    marginal share T_i/(T_i+s_i)^2 = mu, i.e. s_i = max(0, sqrt(T_i/mu) - T_i).
+    The funded blocks are the m smallest T_i, and for them
+      sqrt(mu) = sum_i sqrt(T_i) / (spend + sum_i T_i)
+    so mu follows from prefix sums over T sorted ascending: m is the largest
+    prefix whose biggest block still gets a positive stake.
+    Returns (s, mu). Blocks with no opposing stake are left empty.
+    """
+    pos = T > 0
+    T_sorted = np.sort(T[pos])
+    if spend <= 0:
+        # mu at which nothing is allocated: the best block's marginal share at s = 0
+        return np.zeros_like(T), 1.0 / T_sorted[0]
+    root = np.sqrt(T_sorted)
+    sqrt_mu = np.cumsum(root) / (spend + np.cumsum(T_sorted))
+    m = np.flatnonzero(root * sqrt_mu < 1.0)[-1]
+    T_pos = np.where(pos, T, 0.0)
+    s = np.where(pos, np.maximum(np.sqrt(T_pos) / sqrt_mu[m] - T_pos, 0.0), 0.0)
+    return s, sqrt_mu[m] ** 2
+
+def _waterfill_spend(T, seed, budget, protocol_fee, tol):
+    """
+    Optimal allocation of up to `budget` over the blocks with opposing stake, on top
+    of the fixed `seed` stakes on empty blocks. Returns the added allocation only.
+    The spend is bisected until its bracket is narrower than tol * budget.
+    """
+    n = len(T)
+    pos = T > 0
+    if budget <= 0 or not pos.any():
+        return np.zeros(n, dtype=np.float64)
+    base_sum = T.sum() + seed.sum()
+    base_share = np.count_nonzero(seed)
+
+    def grad(spend):
+        s, mu = _waterfill(T, spend)
+        P = base_share + (s[pos] / (T[pos] + s[pos])).sum()
+        return 1.0 / n - 1.0 + (1.0 - protocol_fee) / n * (P + (base_sum + spend) * mu - 1.0), s
+
+    g, s = grad(0.0)
+    if g <= 0:
+        return s
+    g, s = grad(budget)
+    if g >= 0:
+        return s
+
+    lo, hi = 0.0, budget
+    while hi - lo > tol * budget:
+        mid = 0.5 * (lo + hi)
+        g, s = grad(mid)
+        if g > 0:
+            lo = mid
+        else:
+            hi = mid
+    return grad(lo)[1]
+
+def waterfill_optimize(T_other_gross, budget, unit, protocol_fee, tol=1e-12):
+    """
+    Continuous KKT allocation maximizing SOL EV; returns s_alloc_gross vector.
+
+    With spend X = sum(s) and S = sum(T) + X, the SOL EV is
+      X/n - X + (1 - fee)/n * (S * sum_i s_i/(T_i+s_i) - X)
+    so for fixed X the allocation is a water-filling problem (see _waterfill) and
+      dEV/dX = 1/n - 1 + (1 - fee)/n * (P + S*mu - 1)
+    with P = sum_i s_i/(T_i+s_i). X is found by bisection on the sign of dEV/dX.
+
+    Blocks nobody else deployed on have no interior optimum (any stake takes the
+    whole block), so, like the greedy allocator, they get one `unit` each. They are
+    interchangeable, so every seed count k = 0..min(#empty, budget/unit) is tried
+    with the rest of the budget water-filled, and the best candidate is kept.
+    """
+    T_other_gross = np.array(T_other_gross, dtype=np.float64)
+    n = len(T_other_gross)
+    assert n == 25
+    s = np.zeros(n, dtype=np.float64)
+    if budget <= 0:
+        return s
+
+    empty_idx = np.flatnonzero(T_other_gross <= 0)
+    max_seeds = min(len(empty_idx), int(np.floor(budget / unit + 1e-9)))
+    candidates = [s]
+    for k in range(max_seeds + 1):
+        seed = np.zeros(n, dtype=np.float64)
+        seed[empty_idx[:k]] = unit
+        candidates.append(seed + _waterfill_spend(T_other_gross, seed, budget - k * unit,
+                                                  protocol_fee, tol))
+    candidates = np.array(candidates)
+    return candidates[int(np.argmax(_ev_batch(T_other_gross, candidates, protocol_fee)))]
+
 def pretty_print_grid(arr, label="grid"):
     arr = np.array(arr).reshape((5,5))
     print(f"\n{label} (5x5):")
@@ -198,9 +613,22 @@ def main():
                         help="25 comma-separated numbers for other miners' total (gross) stakes on each block (row-major).")
     parser.add_argument("--grid-file", type=str, default=None, help="CSV file containing 25 numbers for other miners.")
     parser.add_argument("--protocol-fee", type=float, default=0.10, help="Protocol fee fraction on mining rewards (default 0.10).")
-    parser.add_argument("--max-iters", type=int, default=None, help="Max greedy allocation iterations (default based on budget/unit).")
+    parser.add_argument("--max-iters", type=int, default=None,
+                        help="With --legacy-greedy, max greedy allocation iterations (default based on budget/unit).")
+    parser.add_argument("--legacy-greedy", action="store_true",
+                        help="Use the discrete greedy allocator instead of the KKT/water-filling solver.")
+    parser.add_argument("--multiscale", action="store_true",
+                        help="With --legacy-greedy and no compiled kernel (numba, Cython or AOT), run the greedy "
+                             "coarse-to-fine (50x, 10x, 1x unit); otherwise the compiled plain greedy is used.")
+    parser.add_argument("--parallel", action="store_true",
+                        help="With --legacy-greedy and numba, evaluate the 25 candidates per step in parallel.")
+    parser.add_argument("--precision", choices=("f32", "f64"), default="f32",
+                        help="Float precision of the greedy candidate evaluation (default f32); the running "
+                             "state and results are always f64.")
 
     args = parser.parse_args()
+    if args.max_iters is not None and not args.legacy_greedy:
+        parser.error("--max-iters only applies to the greedy allocator (--legacy-greedy)")
 
     if args.other is not None:
         try:
@@ -233,9 +661,18 @@ def main():
     pretty_print_grid(T_other, label="Other miners' gross stakes (per-block)")
     print(f"\nBudget: {args.budget:.6f} SOL, unit: {args.unit:.6f} SOL")
     print(f"Protocol fee: {args.protocol_fee*100:.2f}%")
-    print("\nRunning greedy optimizer... (this may take some seconds depending on budget/unit)")
-
-    s_alloc = greedy_optimize(T_other, args.budget, args.unit, args.protocol_fee, max_iters=args.max_iters)
+    if args.legacy_greedy:
+        print("\nRunning greedy optimizer... (this may take some seconds depending on budget/unit)")
+        if args.multiscale:
+            s_alloc = greedy_multiscale(T_other, args.budget, args.unit, args.protocol_fee,
+                                        precision=args.precision)
+        else:
+            s_alloc = greedy_optimize(T_other, args.budget, args.unit, args.protocol_fee,
+                                      max_iters=args.max_iters, precision=args.precision,
+                                      parallel=args.parallel)
+    else:
+        print("\nRunning KKT/water-filling optimizer...")
+        s_alloc = waterfill_optimize(T_other, args.budget, args.unit, args.protocol_fee)
 
     pretty_print_grid(s_alloc, label="Recommended gross allocation (your deployed SOL per block)")
 
@@ -255,15 +692,8 @@ def main():
 
     # marginal EV per block for adding one unit
     print("\nMarginal EV for adding one unit to each block:")
-    base = compute_ev(T_other, s_alloc, args.protocol_fee)
-    base_score_sol = base['ev_sol_after_fees']
-    for i in range(25):
-        s_test = s_alloc.copy()
-        s_test[i] += args.unit
-        cand = compute_ev(T_other, s_test, args.protocol_fee)
-        cand_score_sol = cand['ev_sol_after_fees']
-        delta_sol = cand_score_sol - base_score_sol
-        print(f"  block {i:02d}: marginal = {delta_sol:+.10f} SOL")
+    deltas = marginal_report(T_other, s_alloc, args.unit, args.protocol_fee)
+    sys.stdout.write("\n".join(f"  block {i:02d}: marginal = {d:+.10f} SOL" for i, d in enumerate(deltas)) + "\n")
 
     print("\nDone.")
 
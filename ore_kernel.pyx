@@ -0,0 +1,92 @@
+# cython: language_level=3, cdivision=True
+"""
+Compiled greedy allocator for main.py.
+
+Same algorithm as main.greedy_optimize (closed-form marginal EV with an
+incrementally updated pool state), written with typed C locals on fixed-size
+arrays. Build with:
+
+  python setup.py build_ext --inplace
+"""
+
+import numpy as np
+
+cimport cython
+
+# grid size as a compile-time constant so the C compiler can fully unroll the block loops
+cdef enum:
+    N = 25
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def greedy_optimize_c(double[::1] T, double budget, double unit, double protocol_fee, max_iters=None):
+    """
+    Greedy allocate discrete units to maximize SOL EV.
+    Returns s_alloc_gross vector.
+    """
+    if T.shape[0] != N:
+        raise ValueError("T must contain exactly 25 numbers.")
+
+    cdef double total[N]
+    cdef double s[N]
+    cdef double share[N]
+    cdef double reward[N]
+    cdef double T_sum = 0.0
+    cdef double s_sum = 0.0
+    cdef double total_sum
+    cdef double share_sum = 0.0
+    cdef double sum_others, reward_bumped, delta_rewards, delta, best_delta
+    cdef Py_ssize_t i, best_idx
+    cdef long step, iters
+    cdef long remaining_units = <long>round(budget / unit)
+
+    out = np.zeros(N, dtype=np.float64)
+    cdef double[::1] out_view = out
+    if remaining_units <= 0:
+        return out
+    iters = remaining_units if max_iters is None else <long>max_iters
+
+    for i in range(N):
+        total[i] = T[i]
+        s[i] = 0.0
+        share[i] = 0.0
+        reward[i] = 0.0
+        T_sum += T[i]
+    total_sum = T_sum + s_sum
+
+    for step in range(iters):
+        if remaining_units <= 0:
+            break
+
+        best_idx = -1
+        best_delta = -1e18
+        for i in range(N):
+            sum_others = total_sum - total[i]
+            reward_bumped = (s[i] + unit) / (total[i] + unit) * sum_others
+            delta_rewards = unit * (share_sum - share[i]) + (reward_bumped - reward[i])
+            delta = unit / N - unit + (1.0 - protocol_fee) * delta_rewards / N
+            if delta > best_delta:
+                best_delta = delta
+                best_idx = i
+
+        if best_delta <= 1e-12:
+            break
+
+        s[best_idx] += unit
+        total[best_idx] += unit
+        s_sum += unit
+        total_sum = T_sum + s_sum
+        remaining_units -= 1
+
+        # every other block's sum_others grew by unit; only best_idx's share moved
+        for i in range(N):
+            reward[i] += unit * share[i]
+        share_sum -= share[best_idx]
+        share[best_idx] = s[best_idx] / total[best_idx]
+        share_sum += share[best_idx]
+        reward[best_idx] = share[best_idx] * (total_sum - total[best_idx])
+
+    for i in range(N):
+        out_view[i] = s[i]
+    return out
@@ -0,0 +1,21 @@
+"""
+Build the optional compiled greedy kernel used by main.py:
+
+  python setup.py build_ext --inplace
+"""
+
+from setuptools import setup, Extension
+from Cython.Build import cythonize
+
+extensions = [
+    Extension(
+        "ore_kernel",
+        ["ore_kernel.pyx"],
+        extra_compile_args=["-O3", "-march=native", "-funroll-all-loops", "-ffast-math"],
+    )
+]
+
+setup(
+    name="ore-bot-kernel",
+    ext_modules=cythonize(extensions, language_level=3),
+)
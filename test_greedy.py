@@ -0,0 +1,94 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import main
+
+
+def reference_greedy(T, budget, unit, fee):
+    """The original greedy: difference compute_ev for every candidate unit."""
+    s = np.zeros(25)
+    for _ in range(int(round(budget / unit))):
+        base = main.compute_ev(T, s, fee)['ev_sol_after_fees']
+        deltas = []
+        for i in range(25):
+            s_test = s.copy()
+            s_test[i] += unit
+            deltas.append(main.compute_ev(T, s_test, fee)['ev_sol_after_fees'] - base)
+        best = int(np.argmax(deltas))
+        if deltas[best] <= 1e-12:
+            break
+        s[best] += unit
+    return s
+
+
+def random_cases(seed, count, units):
+    rng = np.random.default_rng(seed)
+    cases = []
+    for _ in range(count):
+        T = np.where(rng.random(25) < 0.2, 0.0, rng.random(25) * rng.choice([0.05, 0.5]))
+        cases.append((T, units * 0.001, 0.001, rng.choice([0.0, 0.1])))
+    return cases
+
+
+class GreedyBackendTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cases = [(case, reference_greedy(*case)) for case in random_cases(0, 6, 60)]
+
+    def assert_matches_reference(self, **kwargs):
+        for (T, budget, unit, fee), expected in self.cases:
+            s = main.greedy_optimize(T, budget, unit, fee, **kwargs)
+            np.testing.assert_allclose(s, expected, rtol=0, atol=1e-12)
+
+    @unittest.skipIf(main.greedy_optimize_c is None, "Cython kernel not built")
+    def test_cython(self):
+        self.assert_matches_reference()
+
+    @unittest.skipIf(main.greedy_aot is None, "AOT kernel not built")
+    def test_aot(self):
+        with mock.patch.object(main, "greedy_optimize_c", None):
+            self.assert_matches_reference()
+
+    @unittest.skipUnless(main._has_numba, "numba not installed")
+    def test_numba(self):
+        with mock.patch.object(main, "greedy_optimize_c", None), mock.patch.object(main, "greedy_aot", None):
+            self.assert_matches_reference()
+
+    @unittest.skipUnless(main._has_numba, "numba not installed")
+    def test_numba_parallel(self):
+        self.assert_matches_reference(parallel=True)
+
+    def test_numpy(self):
+        with mock.patch.object(main, "greedy_optimize_c", None), mock.patch.object(main, "greedy_aot", None), \
+                mock.patch.object(main, "_has_numba", False):
+            self.assert_matches_reference()
+
+    def test_f32_candidates(self):
+        # float32 marginals may break near-ties differently, but the float64 state keeps the EV
+        backends = {
+            "aot": dict(greedy_aot_f32=main.greedy_aot_f32),
+            "numba": dict(greedy_aot_f32=None),
+            "numpy": dict(greedy_aot_f32=None, _has_numba=False),
+        }
+        for name, patches in backends.items():
+            with self.subTest(backend=name), mock.patch.multiple(main, **patches):
+                for (T, budget, unit, fee), expected in self.cases:
+                    s = main.greedy_optimize(T, budget, unit, fee, precision="f32")
+                    ev = main.compute_ev(T, s, fee)['ev_sol_after_fees']
+                    ev_expected = main.compute_ev(T, expected, fee)['ev_sol_after_fees']
+                    self.assertAlmostEqual(ev, ev_expected, delta=1e-6 * abs(ev_expected))
+
+    def test_multiscale(self):
+        # coarse chunks of 5 units; multiscale may place units differently but must not lose EV.
+        # It only runs its coarse stages on the NumPy fallback, so force that.
+        with mock.patch.multiple(main, greedy_optimize_c=None, greedy_aot=None, _has_numba=False):
+            for T, budget, unit, fee in random_cases(1, 3, 200):
+                expected = main.compute_ev(T, reference_greedy(T, budget, unit, fee), fee)['ev_sol_after_fees']
+                s = main.greedy_multiscale(T, budget, unit, fee, scales=(5, 1))
+                self.assertGreaterEqual(main.compute_ev(T, s, fee)['ev_sol_after_fees'], expected - 1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
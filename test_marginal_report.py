@@ -0,0 +1,52 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import main
+
+
+class MarginalReportTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.T = rng.random(25) * 0.5
+        # not multiples of the unit, so a bump-then-subtract restore would drift
+        self.s = rng.random(25) * 0.01
+
+    def test_matches_compute_ev_differences(self):
+        base = main.compute_ev(self.T, self.s, 0.1)['ev_sol_after_fees']
+        expected = []
+        for i in range(25):
+            s_test = self.s.copy()
+            s_test[i] += 0.001
+            expected.append(main.compute_ev(self.T, s_test, 0.1)['ev_sol_after_fees'] - base)
+        np.testing.assert_allclose(main.marginal_report(self.T, self.s, 0.001, 0.1), expected, rtol=0, atol=1e-15)
+
+    def test_s_alloc_unchanged(self):
+        before = self.s.tobytes()
+        main.marginal_report(self.T, self.s, 0.001, 0.1)
+        self.assertEqual(self.s.tobytes(), before)
+
+    def test_probe_restores_s_in_place(self):
+        s = self.s.copy()
+        main._probe_marginals(self.T, s, 0.001, 0.1)
+        self.assertEqual(s.tobytes(), self.s.tobytes())
+
+    def test_probe_restores_s_on_error(self):
+        s = self.s.copy()
+        calls = []
+
+        def failing_ev(T, s_alloc, fee):
+            calls.append(None)
+            if len(calls) == 5:
+                raise RuntimeError("boom")
+            return 0.0
+
+        with mock.patch.object(main, "_ev_sol", failing_ev):
+            with self.assertRaises(RuntimeError):
+                main._probe_marginals(self.T, s, 0.001, 0.1)
+        self.assertEqual(s.tobytes(), self.s.tobytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
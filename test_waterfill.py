@@ -0,0 +1,32 @@
+import unittest
+
+import numpy as np
+
+from main import compute_ev, greedy_optimize, waterfill_optimize
+
+
+class WaterfillTest(unittest.TestCase):
+    def assert_not_below_greedy(self, T, budget, unit, fee):
+        ev_kkt = compute_ev(T, waterfill_optimize(T, budget, unit, fee), fee)['ev_sol_after_fees']
+        ev_greedy = compute_ev(T, greedy_optimize(T, budget, unit, fee), fee)['ev_sol_after_fees']
+        self.assertGreaterEqual(ev_kkt, ev_greedy - 1e-9, (T.tolist(), budget, unit, fee))
+
+    def test_budget_below_one_seed_per_empty_block(self):
+        T = np.full(25, 0.3)
+        T[:4] = 0.0
+        self.assert_not_below_greedy(T, 0.002, 0.001, 0.1)
+        T = np.full(25, 0.3)
+        T[:19] = 0.0
+        self.assert_not_below_greedy(T, 0.05, 0.01, 0.1)
+
+    def test_random_grids_with_empty_blocks(self):
+        rng = np.random.default_rng(0)
+        for _ in range(30):
+            T = np.where(rng.random(25) < rng.random(), 0.0, rng.random(25) * 0.5)
+            unit = rng.choice([0.001, 0.01])
+            budget = unit * rng.integers(1, 60)
+            self.assert_not_below_greedy(T, budget, unit, rng.choice([0.0, 0.1]))
+
+
+if __name__ == "__main__":
+    unittest.main()